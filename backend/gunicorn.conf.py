@@ -0,0 +1,70 @@
+import gc
+import os
+import math
+
+# --- Multi-worker serving ---
+#
+# The master imports main:app once (preload_app) and forks the workers from
+# it, so the imported libraries and the compiled LangGraph executor are shared
+# copy-on-write instead of being rebuilt in every process. Each worker then
+# recreates its own network clients in post_fork.
+
+# Upper bound for the automatic worker count. The backend is I/O-bound on
+# Gemini/Cohere/Pinecone, so more workers than this mostly adds memory.
+MAX_DEFAULT_WORKERS = 8
+
+
+def available_cpus() -> int:
+    """CPUs this container may actually use: affinity mask capped by the cgroup quota.
+
+    multiprocessing.cpu_count() reports the host's cores, which inside a
+    2-CPU container on a 64-core host would fork 64 workers.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Set WEB_CONCURRENCY to the container's CPU limit to override the default.
+workers = int(os.getenv("WEB_CONCURRENCY", min(available_cpus(), MAX_DEFAULT_WORKERS)))
+preload_app = True
+
+# Blocking SDK calls (Gemini, Cohere, Pinecone, PDF parsing) run in threads so
+# the event loop keeps heartbeating, but a worker is still killed if it goes
+# silent this long. Kept well above gunicorn's 30s default so a slow LLM call
+# or a large ingest is never cut off halfway through its Pinecone upserts.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers do not write to (and thereby copy) the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import main
+
+    main.init_clients()
@@ -6,6 +6,7 @@ from typing import Dict, Any, AsyncGenerator
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv 
@@ -18,7 +19,6 @@ from rag_pipeline import ingest_pdf_document
 
 # Import the compiled LangGraph executor and constants
 from rag_pipeline import langgraph_executor, INDEX_NAME  
-from pinecone import Pinecone
 
 
 load_dotenv()
@@ -28,18 +28,21 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 if not PINECONE_API_KEY:
     raise ValueError("PINECONE_API_KEY not found in environment variables.")
 
-INDEX_NAME = "compliance-docs"
-
-pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-index = pinecone_client.Index(INDEX_NAME)
-
-import cohere
-co = cohere.Client(os.getenv("COHERE_API_KEY"))
+# The Pinecone index and Cohere client are owned by rag_pipeline and looked up
+# through the module at call time, so init_clients() can replace them per worker.
+import rag_pipeline
 
 from openai import OpenAI
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
+def init_clients():
+    """Recreates all network clients; run in each gunicorn worker after fork."""
+    global client
+    rag_pipeline.init_clients()
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
 # --- Pydantic Schemas for Request Bodies ---
 class QueryModel(BaseModel):
     """Defines the expected JSON body for the stream_query endpoint."""
@@ -205,7 +208,7 @@ def embed_text_batch_v2(chunks, batch_size=50):
         print(f"🔢 Embedding batch {i//batch_size + 1} "
               f"({len(batch)} chunks)...")
 
-        response = co.embed(
+        response = rag_pipeline.co.embed(
             texts=batch,
             model="embed-english-v3.0",
             input_type="search_document"
@@ -239,7 +242,7 @@ def store_chunks(doc_id, chunks):
         print(f"   • Prepared chunk {i} for upsert")
 
     if vectors:
-        index.upsert(vectors)
+        rag_pipeline.index.upsert(vectors)
         print(f"✅ {len(vectors)} vectors stored in Pinecone.")
     else:
         print("❌ No vectors to upload!")
@@ -262,8 +265,12 @@ async def ingest_document(
     content = await file.read()
     print(f"📏 File size: {len(content)} bytes\n")
 
+    # PDF parsing, embedding and the Pinecone upsert are all blocking calls;
+    # run them in the threadpool so the worker's event loop (and gunicorn's
+    # heartbeat) keeps running during a long ingest.
+
     # 1. Extract text
-    text = extract_text_from_pdf(content)
+    text = await run_in_threadpool(extract_text_from_pdf, content)
     if len(text.strip()) == 0:
         return {"status": "error", "message": "Could not extract text from PDF"}
 
@@ -273,7 +280,7 @@ async def ingest_document(
         return {"status": "error", "message": "Text chunking failed"}
 
     # 3. Store in Pinecone
-    store_chunks(file.filename, chunks)
+    await run_in_threadpool(store_chunks, file.filename, chunks)
 
     print("🚀 Ingestion pipeline finished!\n")
 
@@ -1,6 +1,7 @@
 import json
 import os
 import asyncio
+from array import array
 from typing import TypedDict, Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, END
 from pinecone import Pinecone
@@ -19,13 +20,6 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables.")
 
-# Initialize the Gemini Client
-try:
-    genai_client = genai.Client(api_key=GEMINI_API_KEY)
-except APIError as e:
-    print(f"Error initializing Gemini client: {e}")
-    # Handle specific errors or raise exception
-    
 # Define models
 LLM_MODEL = "gemini-2.5-flash"
 EMBEDDING_MODEL = "text-embedding-004"
@@ -39,10 +33,84 @@ if not PINECONE_API_KEY:
     raise ValueError("PINECONE_API_KEY not found in environment variables.")
 
 INDEX_NAME = "compliance-docs" 
-pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
 
 import cohere
-co = cohere.Client(os.getenv("COHERE_API_KEY"))
+
+
+def init_clients():
+    """(Re)creates the Gemini, Pinecone and Cohere clients.
+
+    Called once at import and again in every gunicorn worker after fork
+    (see gunicorn.conf.py): the master loads the app once, but HTTP
+    connection pools must not be shared across processes.
+    """
+    global genai_client, pinecone_client, pc, index, co
+    genai_client = genai.Client(api_key=GEMINI_API_KEY)
+    pinecone_client = pc = Pinecone(api_key=PINECONE_API_KEY)
+    index = pc.Index(INDEX_NAME)
+    co = cohere.Client(os.getenv("COHERE_API_KEY"))
+
+
+init_clients()
+
+# Query embeddings are shared by every worker process through a memory-mapped
+# file, so running several workers does not multiply Cohere calls.
+COHERE_EMBED_MODEL = "embed-english-v3.0"
+COHERE_EMBED_DIM = 1024
+COHERE_QUERY_INPUT_TYPE = "search_query"
+
+# The cache is optional: if it cannot be set up (read-only /dev/shm, a file
+# owned by another user, a layout mismatch, no fcntl on this platform) the
+# API still starts and every query goes straight to Cohere.
+try:
+    from shared_cache import SharedEmbeddingCache, default_cache_path
+
+    embedding_cache = SharedEmbeddingCache(
+        path=os.getenv("EMBED_CACHE_PATH", default_cache_path()),
+        dim=COHERE_EMBED_DIM,
+        slots=int(os.getenv("EMBED_CACHE_SLOTS", "4096")),
+        namespace=f"{COHERE_EMBED_MODEL}:{COHERE_QUERY_INPUT_TYPE}",
+    )
+except (ImportError, OSError, ValueError) as e:
+    print(f"WARNING: Shared embedding cache disabled ({type(e).__name__}: {e}).")
+    embedding_cache = None
+
+
+def _disable_embedding_cache(e: Exception):
+    """Turns the cache off after a runtime failure, e.g. the post-fork reopen."""
+    global embedding_cache
+    if embedding_cache is not None:
+        embedding_cache = None
+        print(f"WARNING: Shared embedding cache disabled ({type(e).__name__}: {e}).")
+
+
+def embed_query(query: str) -> List[float]:
+    """Embeds a search query with Cohere, served from the shared cache when possible."""
+    cache = embedding_cache
+    if cache is not None:
+        try:
+            cached = cache.get(query)
+        except (OSError, ValueError) as e:
+            _disable_embedding_cache(e)
+            cache = cached = None
+        if cached is not None:
+            return cached
+
+    resp = co.embed(
+        texts=[query],
+        model=COHERE_EMBED_MODEL,
+        input_type=COHERE_QUERY_INPUT_TYPE
+    )
+    # Round to float32 so a query gets the same vector whether or not it was
+    # served from the cache, which stores float32.
+    vector = array("f", resp.embeddings[0]).tolist()
+
+    if cache is not None:
+        try:
+            cache.put(query, vector)
+        except (OSError, ValueError) as e:
+            _disable_embedding_cache(e)
+    return vector
 
 
 # --- 3. (Optional) Function to check if the index exists ---
@@ -91,7 +159,8 @@ class LLMServices:
 
 class LLMService:
     async def classify_intent(self, query: str) -> str:
-        resp = genai_client.models.generate_content(
+        resp = await asyncio.to_thread(
+            genai_client.models.generate_content,
             model=LLM_MODEL,
             contents=f"Classify this into SIMPLE_RAG or VETTING_CHECK only:\n\n{query}"
         )
@@ -100,7 +169,8 @@ class LLMService:
 
     async def generate_response(self, context: str, query: str) -> str:
         prompt = f"Context:\n{context}\n\nUser Query:\n{query}\n\nWrite a clear final response:"
-        resp = genai_client.models.generate_content(
+        resp = await asyncio.to_thread(
+            genai_client.models.generate_content,
             model=LLM_MODEL,
             contents=prompt
         )
@@ -138,9 +208,6 @@ class PineconeServices:
         }
 
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
-
 class PineconeService:
     async def retrieve_legal_acts(self, query: str, top_k: int = 3) -> List[str]:
 
@@ -152,16 +219,10 @@ class PineconeService:
         # vector = embed.embeddings[0].values
 
 
-        resp = co.embed(
-            texts=[query],
-            model="embed-english-v3.0",
-            input_type="search_query"
-        )
-
-        vector = resp.embeddings[0]
+        vector = await asyncio.to_thread(embed_query, query)
 
 
-        res = index.query(vector=vector, top_k=top_k, include_metadata=True)
+        res = await asyncio.to_thread(index.query, vector=vector, top_k=top_k, include_metadata=True)
         return [m["metadata"].get("text", "") for m in res["matches"]]
 
     async def perform_anomaly_check(self, query: str) -> Dict[str, Any]:
@@ -174,15 +235,9 @@ class PineconeService:
         # vector = embed.embeddings[0].values
 
 
-        resp = co.embed(
-            texts=[query],
-            model="embed-english-v3.0",
-            input_type="search_query"
-        )
-
-        vector = resp.embeddings[0]
+        vector = await asyncio.to_thread(embed_query, query)
 
-        res = index.query(vector=vector, top_k=5, include_metadata=True)
+        res = await asyncio.to_thread(index.query, vector=vector, top_k=5, include_metadata=True)
         return {
             "chunks": [m["metadata"] for m in res["matches"]],
             "overall_status": "AUTO",
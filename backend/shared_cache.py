@@ -0,0 +1,176 @@
+import os
+import mmap
+import fcntl
+import stat
+import struct
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from array import array
+from typing import List, Optional
+
+
+# --- Shared Query-Embedding Cache ---
+#
+# Every worker process maps the same file (in /dev/shm when available), so a
+# query embedded by one worker is found by all the others without a second
+# Cohere round-trip. Lookups copy the slot out of the mapping into a Python
+# list under a short flock; the lock is held only for that copy.
+#
+# The table is direct-mapped: each query hashes to exactly one slot and a
+# newer entry simply overwrites an older one. Keys are namespaced by the
+# embedding model and input type, and the header records the same namespace,
+# so vectors from a different model are never served.
+#
+# File layout:
+#   header: magic (8s) | dim (I) | slots (I) | namespace (64s)
+#   slot:   key digest (16 bytes, all zeros = empty) | dim x float32
+#
+# The file is never resized once created: other workers may have it mapped,
+# and shrinking a mapped file kills them with SIGBUS. A file with a different
+# dim or slot count is rejected with ValueError instead. New files are fully
+# allocated up front, so a full tmpfs fails at startup with OSError rather
+# than with SIGBUS on the first write through the mapping.
+#
+# The default path lives in a world-writable directory, so the file must be a
+# regular file (no symlinks) owned by us and private to us; anything else is
+# refused, since whoever can write it controls the vectors we retrieve with.
+
+MAGIC = b"CMPLYNT2"
+HEADER = struct.Struct("<8sII64s")
+KEY_SIZE = 16
+EMPTY_KEY = b"\x00" * KEY_SIZE
+
+
+def default_cache_path() -> str:
+    """Prefers tmpfs so the mapping never touches disk."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "complynt-embed-cache")
+
+
+class SharedEmbeddingCache:
+    """Fixed-size, memory-mapped cache of query embeddings shared across worker processes."""
+
+    def __init__(self, path: str, dim: int, slots: int, namespace: str):
+        self.path = path
+        self.dim = dim
+        self.slots = slots
+        self.namespace = namespace.encode("utf-8")
+        if len(self.namespace) > 64:
+            raise ValueError(f"Cache namespace too long: {namespace!r}")
+        self.slot_size = KEY_SIZE + dim * 4
+        self.size = HEADER.size + slots * self.slot_size
+        # flock only excludes other processes; threads of one worker (the
+        # embedding calls run in a threadpool) are serialised here instead.
+        self._thread_lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            self._check_owner()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map = self._attach()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _check_owner(self):
+        st = os.fstat(self._fd)
+        if not stat.S_ISREG(st.st_mode):
+            raise PermissionError(f"Embedding cache '{self.path}' is not a regular file.")
+        if st.st_uid != os.geteuid():
+            raise PermissionError(f"Embedding cache '{self.path}' is owned by uid {st.st_uid}, not us.")
+        if st.st_mode & 0o077:
+            raise PermissionError(
+                f"Embedding cache '{self.path}' is accessible to other users "
+                f"(mode {stat.S_IMODE(st.st_mode):o}); expected 600."
+            )
+
+    def _attach(self) -> mmap.mmap:
+        """Maps the file, initialising it if new. Called with the exclusive lock held."""
+        expected = HEADER.pack(MAGIC, self.dim, self.slots, self.namespace)
+        current_size = os.fstat(self._fd).st_size
+
+        if current_size == 0:
+            # Nobody can have an empty file mapped, so undoing a partial
+            # allocation here is safe.
+            try:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(self._fd, 0, self.size)
+                else:
+                    os.ftruncate(self._fd, self.size)
+            except OSError:
+                os.ftruncate(self._fd, 0)
+                raise
+            os.pwrite(self._fd, expected, 0)
+            return mmap.mmap(self._fd, self.size, mmap.MAP_SHARED)
+
+        raw = os.pread(self._fd, HEADER.size, 0)
+        if current_size != self.size or len(raw) < HEADER.size:
+            raise ValueError(
+                f"Embedding cache '{self.path}' has a different size "
+                f"({current_size} bytes, expected {self.size}); use another EMBED_CACHE_PATH."
+            )
+        magic, dim, slots, _ = HEADER.unpack(raw)
+        if (magic, dim, slots) != (MAGIC, self.dim, self.slots):
+            raise ValueError(
+                f"Embedding cache '{self.path}' has a different layout "
+                f"(dim={dim}, slots={slots}); use another EMBED_CACHE_PATH."
+            )
+
+        mapping = mmap.mmap(self._fd, self.size, mmap.MAP_SHARED)
+        if raw != expected:
+            # Same shape, different model or input type: wipe the slots in
+            # place so the file keeps its size for anyone still mapping it.
+            for slot in range(self.slots):
+                offset = HEADER.size + slot * self.slot_size
+                mapping[offset:offset + KEY_SIZE] = EMPTY_KEY
+            mapping[:HEADER.size] = expected
+        return mapping
+
+    @contextmanager
+    def _locked(self, mode: int):
+        with self._thread_lock:
+            # flock is tied to the open file description, which a forked child
+            # shares with its parent; reopen so each process locks independently.
+            if self._pid != os.getpid():
+                self._map.close()
+                os.close(self._fd)
+                self._open()
+            fcntl.flock(self._fd, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _locate(self, text: str):
+        key = hashlib.blake2b(
+            self.namespace + b"\x00" + text.encode("utf-8"), digest_size=KEY_SIZE
+        ).digest()
+        slot = int.from_bytes(key[:8], "little") % self.slots
+        return key, HEADER.size + slot * self.slot_size
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Returns the cached embedding for `text`, or None on a miss."""
+        key, offset = self._locate(text)
+        with self._locked(fcntl.LOCK_SH):
+            if self._map[offset:offset + KEY_SIZE] != key:
+                return None
+            vector = array("f")
+            vector.frombytes(self._map[offset + KEY_SIZE:offset + self.slot_size])
+        return vector.tolist()
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        """Stores `embedding` for `text`, evicting whatever occupied its slot."""
+        if len(embedding) != self.dim:
+            return
+        key, offset = self._locate(text)
+        payload = key + array("f", embedding).tobytes()
+        with self._locked(fcntl.LOCK_EX):
+            self._map[offset:offset + self.slot_size] = payload
@@ -0,0 +1,143 @@
+import os
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shared_cache import SharedEmbeddingCache
+
+
+DIM = 4
+NAMESPACE = "embed-english-v3.0:search_query"
+
+
+def _put_in_child(path, text, vector):
+    cache = SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+    cache.put(text, vector)
+
+
+def _get_in_child(cache, text, queue):
+    queue.put(cache.get(text))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "embed-cache")
+
+
+def test_round_trip_across_processes(path):
+    ctx = multiprocessing.get_context("spawn")
+    child = ctx.Process(target=_put_in_child, args=(path, "kra tcc", [0.5, 1.0, 2.0, 4.0]))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+    cache = SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+    assert cache.get("kra tcc") == [0.5, 1.0, 2.0, 4.0]
+    assert cache.get("nssf") is None
+
+
+def test_forked_child_reads_parent_mapping(path):
+    cache = SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+    cache.put("kra tcc", [1.0, 2.0, 3.0, 4.0])
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    child = ctx.Process(target=_get_in_child, args=(cache, "kra tcc", queue))
+    child.start()
+    result = queue.get(timeout=10)
+    child.join()
+
+    assert child.exitcode == 0
+    assert result == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_concurrent_threads_never_see_torn_vectors(path):
+    cache = SharedEmbeddingCache(path, DIM, 1, NAMESPACE)
+
+    def hammer(i):
+        value = float(i)
+        cache.put("shared", [value] * DIM)
+        vector = cache.get("shared")
+        # Every reader sees one writer's full vector, never a mix of two.
+        return vector is not None and len(set(vector)) == 1
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(hammer, range(500)))
+
+
+def test_collision_evicts_previous_entry(path):
+    cache = SharedEmbeddingCache(path, DIM, 1, NAMESPACE)
+    cache.put("first", [1.0, 1.0, 1.0, 1.0])
+    cache.put("second", [2.0, 2.0, 2.0, 2.0])
+
+    assert cache.get("first") is None
+    assert cache.get("second") == [2.0, 2.0, 2.0, 2.0]
+
+
+def test_wrong_dimension_is_not_stored(path):
+    cache = SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+    cache.put("short", [1.0, 2.0])
+
+    assert cache.get("short") is None
+
+
+def test_shape_mismatch_is_rejected_without_resizing(path):
+    cache = SharedEmbeddingCache(path, DIM, 64, NAMESPACE)
+    cache.put("kra tcc", [1.0, 2.0, 3.0, 4.0])
+    size = os.path.getsize(path)
+
+    with pytest.raises(ValueError):
+        SharedEmbeddingCache(path, DIM, 16, NAMESPACE)
+    with pytest.raises(ValueError):
+        SharedEmbeddingCache(path, DIM * 2, 64, NAMESPACE)
+
+    # The existing mapping must survive untouched (shrinking it would SIGBUS).
+    assert os.path.getsize(path) == size
+    assert cache.get("kra tcc") == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_namespace_change_wipes_stale_vectors(path):
+    old = SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+    old.put("kra tcc", [1.0, 2.0, 3.0, 4.0])
+
+    new = SharedEmbeddingCache(path, DIM, 8, "embed-multilingual-v3.0:search_query")
+
+    assert new.get("kra tcc") is None
+    assert old.get("kra tcc") is None
+
+
+def test_symlinked_cache_file_is_refused(path, tmp_path):
+    target = tmp_path / "elsewhere"
+    target.touch(mode=0o600)
+    os.symlink(target, path)
+
+    with pytest.raises(OSError):
+        SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+
+
+def test_cache_file_writable_by_others_is_refused(path):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    os.close(fd)
+    os.chmod(path, 0o666)
+
+    with pytest.raises(PermissionError):
+        SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="needs root to chown")
+def test_cache_file_owned_by_another_user_is_refused(path):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    os.close(fd)
+    os.chown(path, 65534, 65534)
+
+    with pytest.raises(PermissionError):
+        SharedEmbeddingCache(path, DIM, 8, NAMESPACE)
+
+
+def test_new_cache_file_is_fully_allocated(path):
+    cache = SharedEmbeddingCache(path, DIM, 64, NAMESPACE)
+    st = os.stat(path)
+
+    assert st.st_size == cache.size
+    assert st.st_blocks * 512 >= cache.size